@@ -1,8 +1,10 @@
 # /// script
 # requires-python = ">=3.13"
 # dependencies = [
+#     "orjson",
 #     "requests",
 #     "xattr",
+#     "xxhash",
 #     "zstandard",
 # ]
 # ///
@@ -21,14 +23,18 @@ Options:
     --query      Custom query to replace the default q parameter
     --series     One or more positive integers representing series IDs to query
     --iiif       Retrieve only records with IIIF metadata
-    --output     Output file name (default: harvest.json or harvest.json.zst if compressed)
+    --output     Output file name (default: harvest.json or harvest.jsonl, with .zst if compressed)
+    --jsonl      Write one JSON record per line (JSON Lines) rather than a JSON array
     --rows       Number of rows to fetch per request
+    --fields     Comma-separated list of fields to return (default: all fields)
     --resume     Resume from last saved progress
     --compress   Enable zstd compression for output
     --wait       Additional wait time between requests in seconds (default: 0)
+    --workers    Number of requests to have in flight at once (default: 1, max: 4)
     --sort       Sorting option for the query results (score, title or default: identifier)
     --debug      Debug mode to print additional information, specify more to get more
     --start      Starting index for the query (for debugging purposes)
+    --cursor     Page through results with a Solr cursor rather than start offsets
     --version    Show the version number and exit
 
 The script uses rate limiting, error handling, and optional zstd compression to ensure
@@ -40,26 +46,47 @@ import sys
 import time
 import argparse
 import os
-from urllib.parse import urlencode
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import quote, urlencode
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
 import xattr
+import xxhash
 import zstandard as zstd
 
-VERSION = "0.8.5"
+VERSION = "0.9.0"
 
 BASE_URL = "https://api.prov.vic.gov.au/search/query"
-PARAMS = {
-    "rows": "1000",
-    "start": "0",
-    "sort": "identifier.PROV_ACM.id asc",
-    "wt": "json",
-    "q": "*:*"
-}
+DEFAULT_PARAMS = (
+    ("rows", "1000"),
+    ("sort", "identifier.PROV_ACM.id asc"),
+    ("wt", "json"),
+    ("q", "*:*"),
+)
+CURSOR_TIEBREAK_SORT = "_id asc"  # cursors need the unique key in the sort
 
 MAX_CONSECUTIVE_FAILURES = 6
 BASE_WAIT_TIME = 63  # seconds
 PROGRESS_XATTR_NAME = "org.gunzel.prov-api-harvester.progress"
+PROGRESS_FILE_SUFFIX = ".progress.json"
+PROGRESS_SAVE_INTERVAL = 10  # batches
+ZSTD_LEVEL = 10
+ZSTD_WINDOW_LOG = 23  # 8 MB, so decoders don't need 128 MB each
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+OUTPUT_BUFFER_SIZE = 4 * 1024 * 1024
+MAX_WORKERS = 4
+
+# Reuse keep-alive connections (one per worker) for every request rather than
+# paying for a new TCP and TLS handshake per batch
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+SESSION.headers["User-Agent"] = f"prov-api-harvester/{VERSION}"
 
 
 class TooManyFailedRequestsError(Exception):
@@ -69,35 +96,56 @@ class TooManyFailedRequestsError(Exception):
     """
 
 
-def fetch_data(url, debug_level=0):
+class HarvestStoppedError(Exception):
+    """
+    Custom exception raised by a prefetch that is abandoned because the
+    harvest is stopping.
+    """
+
+
+def fetch_data(url, debug_level=0, stop=None):
     """
     Fetch data from the given URL with error handling and retries.
 
     Args:
         url (str): The URL to fetch data from.
         debug_level (int): Debug level (0: no debug, 1: basic debug, 2: verbose debug with headers).
+        stop (threading.Event or None): Set when the harvest is stopping, to cut short the wait before a retry.
 
     Returns:
         tuple: A tuple containing the JSON response, headers, and content length.
 
     Raises:
         TooManyFailedRequestsError: If the maximum number of retries is exceeded.
+        HarvestStoppedError: If the harvest stops while waiting to retry.
     """
     consecutive_failures = 0
     while consecutive_failures < MAX_CONSECUTIVE_FAILURES:
         try:
             if debug_level >= 1:
                 print(f"Fetching data from {url}", file=sys.stderr)
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            return response.json(), response.headers, len(response.content)
-        except requests.exceptions.RequestException as e:
+            response = SESSION.get(url, timeout=60, stream=True)
+            try:
+                response.raise_for_status()
+                # Read the body in one go rather than having response.content
+                # join it from chunks, then let orjson parse the raw bytes
+                body = response.raw.read(decode_content=True)
+            finally:
+                response.close()
+            return orjson.loads(body), response.headers, len(body)
+        except (requests.exceptions.RequestException,
+                urllib3.exceptions.HTTPError,
+                orjson.JSONDecodeError) as e:
             consecutive_failures += 1
             wait_time = BASE_WAIT_TIME * consecutive_failures
 
             if isinstance(
                     e,
                     requests.exceptions.HTTPError) and e.response.status_code == 429:
+                # Wait as long as the server asks, when it says
+                retry_after = e.response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    wait_time = int(retry_after)
                 print(
                     f"Rate limit exceeded (429). Attempt {consecutive_failures}/{MAX_CONSECUTIVE_FAILURES}. Waiting {wait_time} seconds before retrying...",
                     file=sys.stderr)
@@ -110,33 +158,107 @@ def fetch_data(url, debug_level=0):
                     f"An error occurred: {e}. Attempt {consecutive_failures}/{MAX_CONSECUTIVE_FAILURES}. Waiting {wait_time} seconds before retrying...",
                     file=sys.stderr)
 
-            time.sleep(wait_time)
+            if stop is None:
+                time.sleep(wait_time)
+            elif stop.wait(wait_time):
+                raise HarvestStoppedError("Harvest stopped while waiting to retry.")
             if debug_level >= 1:
                 print("Retrying request...", file=sys.stderr)
     raise TooManyFailedRequestsError(
         f"Failed to fetch data after {MAX_CONSECUTIVE_FAILURES} consecutive attempts. Exiting.")
 
 
-def check_rate_limit(headers, wait_time):
+def check_rate_limit(headers, wait_time, elapsed=0, workers=1, stop=None):
     """
     Check the rate limit from the response headers and sleep if necessary.
 
+    The requests left in the current minute (and hour) are spread evenly over
+    what's left of it, as reported by the gateway or else assumed from the
+    clock, so we go as fast as the budget allows without running into 429s.
+    Time already spent on the previous request counts towards the gap, and
+    the gap is stretched by the number of requests in flight at once.
+
     Args:
         headers (dict): The response headers containing rate limit information.
-        wait_time (int): The wait time between requests in seconds.
+        wait_time (int): The additional wait time between requests in seconds.
+        elapsed (float): Seconds already spent since the previous request started.
+        workers (int): Number of requests in flight at once.
+        stop (threading.Event or None): Set when the harvest is stopping, to cut short the wait.
     """
-    remaining = int(headers.get('x-ratelimit-remaining-minute', 20))
-    time.sleep(wait_time)
-    if remaining < 20:
+    delay = 0
+    remaining = None
+    reset_used = 'ratelimit-reset' not in headers
+    for name, window in (('minute', 60), ('hour', 3600)):
+        header = f'x-ratelimit-remaining-{name}'
+        if header in headers:
+            window_remaining = int(headers[header])
+            window_left = window - time.time() % window
+            if not reset_used:
+                # The gateway says exactly when one of the windows resets,
+                # which beats assuming it lines up with the clock. Tell which
+                # by its limit if we can, as the remaining counts can be
+                # equal, and otherwise give it to the shortest window that
+                # matches.
+                limit_header = f'x-ratelimit-limit-{name}'
+                if 'ratelimit-limit' in headers and limit_header in headers:
+                    reset_used = headers['ratelimit-limit'] == headers[limit_header]
+                else:
+                    reset_used = headers.get('ratelimit-remaining') == headers[header]
+                if reset_used:
+                    window_left = float(headers['ratelimit-reset'])
+            # Never wait past the window reset, even when there are more
+            # requests in flight than left in the window
+            delay = max(delay, min(window_left, window_left * workers / (window_remaining + 1)) - elapsed)
+            if name == 'minute':
+                remaining = window_remaining
+
+    if remaining is not None and remaining < 20 and delay > 0:
         print(
-            f"Rate limit approaching. Remaining: {remaining}. Sleeping for 2 seconds...",
+            f"Rate limit approaching. Remaining: {remaining}. Sleeping for {delay:.2f} seconds...",
             file=sys.stderr)
-        time.sleep(2)
+    if stop is None:
+        time.sleep(wait_time + max(delay, 0))
+    else:
+        stop.wait(wait_time + max(delay, 0))
+
+
+def fetch_batch(url, headers, wait_time, debug_level=0, elapsed=0, workers=1, stop=None):
+    """
+    Fetch a batch of records, first waiting out the rate limit reported by the previous batch.
+
+    This is run on a background thread so the next batch downloads while the
+    current one is being written.
+
+    Args:
+        url (str): The URL to fetch data from.
+        headers (dict or None): The previous response's headers, or None for the first batch.
+        wait_time (int): The additional wait time between requests in seconds.
+        debug_level (int): Debug level (0: no debug, 1: basic debug, 2: verbose debug with headers).
+        elapsed (float): How long the previous request took, in seconds.
+        workers (int): Number of requests in flight at once.
+        stop (threading.Event or None): Set when the harvest is stopping, so the batch is abandoned.
+
+    Returns:
+        tuple: A tuple containing the JSON response, headers, content length and fetch duration.
+
+    Raises:
+        HarvestStoppedError: If the harvest stops before the request is made.
+    """
+    if headers is not None:
+        check_rate_limit(headers, wait_time, elapsed, workers, stop)
+    if stop is not None and stop.is_set():
+        raise HarvestStoppedError("Harvest stopped before the request was made.")
+
+    fetch_start_time = time.monotonic()
+    data, headers, content_size = fetch_data(url, debug_level, stop)
+    return data, headers, content_size, time.monotonic() - fetch_start_time
 
 
 def load_progress(output_file):
     """
-    Load the progress from the output file's extended attribute if it exists.
+    Load the progress from the output file's progress file if it exists.
+
+    Falls back to the extended attribute used by earlier versions.
 
     Args:
         output_file (str): The path to the output file.
@@ -147,6 +269,12 @@ def load_progress(output_file):
     if not os.path.exists(output_file):
         return None
 
+    try:
+        with open(f"{output_file}{PROGRESS_FILE_SUFFIX}", 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
     try:
         progress_data = xattr.getxattr(
             output_file, PROGRESS_XATTR_NAME).decode('utf-8')
@@ -157,35 +285,107 @@ def load_progress(output_file):
 
 def save_progress(output_file, progress_data):
     """
-    Save the progress data to the output file's extended attribute.
+    Save the progress data to the output file's progress file.
+
+    The progress is written to a temporary file and renamed into place, so a
+    crash leaves either the old progress or the new, never a partial file.
 
     Args:
         output_file (str): The path to the output file.
         progress_data (dict): The progress data to save.
     """
-    progress_json = json.dumps(progress_data)
-    xattr.setxattr(
-        output_file,
-        PROGRESS_XATTR_NAME,
-        progress_json.encode('utf-8'))
+    progress_file = f"{output_file}{PROGRESS_FILE_SUFFIX}"
+    with open(f"{progress_file}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(progress_data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{progress_file}.tmp", progress_file)
+
+
+def remove_progress(output_file):
+    """
+    Remove the saved progress for the output file, including any left by earlier versions
+    or by a save that was cut short.
+
+    Args:
+        output_file (str): The path to the output file.
+    """
+    for path in (f"{output_file}{PROGRESS_FILE_SUFFIX}", f"{output_file}{PROGRESS_FILE_SUFFIX}.tmp"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
+    try:
+        xattr.removexattr(output_file, PROGRESS_XATTR_NAME)
+    except OSError:
+        pass
 
-def prepare_output_file(output_file, resume, compress):
+
+def open_output_file(output_file, resume, compress, size_hint=None):
     """
-    Prepare the output file for writing, either by truncating or appending.
+    Open the output file for writing, either from scratch or appending to it.
+
+    Compressed output goes through a single multithreaded zstd stream writer.
+    Either way, writes are gathered in a large buffer so the file sees a few
+    big writes rather than one per batch or compressed block.
 
     Args:
         output_file (str): The path to the output file.
-        resume (bool): If True, prepare for resuming; otherwise, start fresh.
+        resume (bool): If True, append to the existing file; otherwise, start fresh.
         compress (bool): If True, use zstd compression; otherwise, use plain text.
+        size_hint (int): Rough number of bytes still to be written, if known.
+
+    Returns:
+        file object: A binary file-like object to write to.
+    """
+    raw_file = open(output_file, 'ab' if resume else 'wb', buffering=OUTPUT_BUFFER_SIZE)
+    if compress:
+        # Small harvests don't need (or benefit from) the full window, so
+        # shrink it to fit and let zstd tune the rest for the expected size
+        window_log = ZSTD_WINDOW_LOG
+        if size_hint:
+            window_log = min(window_log, max(zstd.WINDOWLOG_MIN, size_hint.bit_length()))
+
+        # Records repeat the same field names and values close together, so a
+        # moderate window loses little ratio and keeps decoder memory down
+        params = zstd.ZstdCompressionParameters.from_level(
+            ZSTD_LEVEL,
+            source_size=size_hint or 0,
+            window_log=window_log,
+            threads=-1)
+        file = zstd.ZstdCompressor(
+            compression_params=params).stream_writer(raw_file)
+    else:
+        file = raw_file
+
+    return file
+
+
+def hash_output_segment(output_file, compress, offset):
+    """
+    Hash the uncompressed contents of an existing output file from the given offset to the end.
+
+    Args:
+        output_file (str): The path to the output file.
+        compress (bool): If True, the file is zstd compressed; otherwise, plain text.
+        offset (int): Where the segment starts, which must be a zstd frame boundary if compressed.
+
+    Returns:
+        str: The xxh3 hex digest of the segment.
     """
-    if not resume:
+    hasher = xxhash.xxh3_64()
+    with open(output_file, 'rb') as raw_file:
+        raw_file.seek(offset)
         if compress:
-            with zstd.open(output_file, 'wb') as f:
-                f.write(b"[")
+            # Every progress save ends a zstd frame
+            file = zstd.ZstdDecompressor().stream_reader(
+                raw_file, read_across_frames=True)
         else:
-            with open(output_file, 'wb') as f:
-                f.write(b"[")
+            file = raw_file
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 def stream_records(
@@ -194,7 +394,11 @@ def stream_records(
         compress=False,
         debug_level=0,
         wait_time=0,
-        start_index=0):
+        start_index=0,
+        workers=1,
+        params=None,
+        cursor=False,
+        jsonl=False):
     """
     Stream records from the PROV API, optionally compressing and writing them to the output file.
 
@@ -205,7 +409,13 @@ def stream_records(
         debug_level (int): Debug level (0: no debug, 1: basic debug, 2: verbose debug with headers).
         wait_time (int): Wait time between requests in seconds.
         start_index (int): Starting index for the query (for debugging purposes).
+        workers (int): Number of requests to have in flight at once.
+        params (dict): Query parameters for the API, other than start (default: DEFAULT_PARAMS).
+        cursor (bool): If True, page with cursorMark rather than start offsets.
+        jsonl (bool): If True, write JSON Lines rather than a JSON array.
     """
+    if params is None:
+        params = dict(DEFAULT_PARAMS)
     in_progress_file = f"{output_file}.in-progress"
 
     if resume and not os.path.exists(in_progress_file):
@@ -215,58 +425,217 @@ def stream_records(
         sys.exit(1)
 
     progress = load_progress(in_progress_file) if resume else None
+    if resume and progress is None:
+        # Stopped before progress was ever saved, so there is nothing in the
+        # file that can be trusted
+        print(
+            f"No saved progress for {in_progress_file}. Starting from the beginning.",
+            file=sys.stderr)
+        resume = False
     start = progress['start'] if progress else start_index
     total_bytes = progress['total_bytes'] if progress else 0
     total_docs = progress['total_docs'] if progress else float('inf')
+    cursor_mark = progress.get('cursor', '*') if progress else '*'
     first_record = not resume
 
+    # Hash what's written between progress saves, so a resume can tell
+    # whether the end of the file still matches the saved progress without
+    # reading all of it
+    hasher = xxhash.xxh3_64()
+    segment_start = 0
     if resume:
+        if progress and ('cursor' in progress) != cursor:
+            print(
+                f"Error: Cannot resume. {in_progress_file} was {'not ' if cursor else ''}started with --cursor.",
+                file=sys.stderr)
+            sys.exit(1)
+        if progress and progress.get('jsonl', False) != jsonl:
+            print(
+                f"Error: Cannot resume. {in_progress_file} was {'not ' if jsonl else ''}started with --jsonl.",
+                file=sys.stderr)
+            sys.exit(1)
+
+        # Drop anything written after the last time progress was saved
+        file_size = os.path.getsize(in_progress_file)
+        if 'offset' in progress and file_size > progress['offset']:
+            os.truncate(in_progress_file, progress['offset'])
+            file_size = progress['offset']
+
+        # Only what was written since the previous save is checked, so this
+        # doesn't have to read the whole file. Progress saved by older
+        # versions has no segment hash to check.
+        if 'segment_xxh3' in progress:
+            try:
+                matches = file_size == progress['offset'] and hash_output_segment(
+                    in_progress_file, compress, progress['segment_start']) == progress['segment_xxh3']
+            except zstd.ZstdError:
+                matches = False
+            if not matches:
+                print(
+                    f"Error: Cannot resume. File {in_progress_file} does not match the saved progress.",
+                    file=sys.stderr)
+                sys.exit(1)
+        segment_start = file_size
         print(f"Resuming from record {start}", file=sys.stderr)
-    elif start_index > 0:
-        print(f"Starting from record {start_index}", file=sys.stderr)
-
-    prepare_output_file(in_progress_file, resume, compress)
-
-    overall_start_time = time.time()
+    else:
+        # Progress from an earlier run doesn't describe the file we're about
+        # to start, so don't leave it for a later --resume to find
+        remove_progress(in_progress_file)
+        if start_index > 0:
+            print(f"Starting from record {start_index}", file=sys.stderr)
+
+    def write(data):
+        file.write(data)
+        hasher.update(data)
+
+    def batch_url(batch_start, mark):
+        if cursor:
+            return f"{base_url}&cursorMark={quote(mark)}"
+        return f"{base_url}&start={batch_start}"
+
+    def checkpoint():
+        nonlocal segment_start
+        # End the zstd frame so the file can be cut back to this point on
+        # resume, and make sure it's on disk before the progress says so
+        if compress:
+            file.flush(zstd.FLUSH_FRAME)
+        else:
+            file.flush()
+        os.fsync(file.fileno())
+        if hasattr(os, 'posix_fadvise'):
+            # What's been written won't be read again, so once it's safely on
+            # disk don't let it crowd everything else out of the page cache
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        offset = os.fstat(file.fileno()).st_size
+        progress = {
+            'start': start,
+            'total_bytes': total_bytes,
+            'total_docs': total_docs,
+            'offset': offset,
+            'segment_start': segment_start,
+            'segment_xxh3': hasher.hexdigest()
+        }
+        if cursor:
+            progress['cursor'] = cursor_mark
+        if jsonl:
+            progress['jsonl'] = True
+        save_progress(in_progress_file, progress)
+        segment_start = offset
+        hasher.reset()
+
+    overall_start_time = time.monotonic()
     total_fetched = 0
 
-    try:
-        file_opener = zstd.open if compress else open
+    # Batches are fetched ahead in parallel but written strictly in order, so
+    # the output and saved progress are the same as a sequential harvest
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # Set when we're done, so prefetch threads stop waiting and the
+    # interpreter doesn't hang on exit while they sleep out a retry or rate
+    # limit
+    stop = threading.Event()
+    pending = deque()
+    rows = int(params['rows'])
+    batch_count = 0
+
+    # Only the start offset changes between requests, so build the rest of
+    # the URL once
+    base_url = f"{BASE_URL}?{urlencode(params)}"
 
-        with file_opener(in_progress_file, 'ab') as file:
-            while start < total_docs:
-                PARAMS['start'] = str(start)
-                url = f"{BASE_URL}?{urlencode(PARAMS)}"
-
-                fetch_start_time = time.time()
-                data, headers, content_size = fetch_data(url, debug_level)
-                fetch_end_time = time.time()
+    try:
+        with ExitStack() as stack:
+            file = None
+
+            if start < total_docs:
+                url = batch_url(start, cursor_mark)
+                pending.append((start, executor.submit(
+                    fetch_batch, url, None, wait_time, debug_level, stop=stop)))
+            next_start = start + rows
+
+            while pending:
+                batch_start, batch = pending.popleft()
+                try:
+                    data, headers, content_size, fetch_duration = batch.result()
+                except (KeyboardInterrupt, TooManyFailedRequestsError):
+                    # Everything fetched so far has been written, so save it
+                    # before giving up, ready for --resume
+                    if file is not None:
+                        checkpoint()
+                    raise
 
                 docs = data['response']['docs']
                 total_docs = data['response']['numFound']
 
-                for doc in docs:
+                # Open the output once the first batch gives us an idea of how
+                # much there is still to write
+                if file is None:
+                    size_hint = content_size * max(total_docs - start, 0) // max(len(docs), 1)
+                    file = stack.enter_context(open_output_file(
+                        in_progress_file, resume, compress, size_hint))
+                    if not resume and not jsonl:
+                        write(b"[")
+
+                # Request the next batches before writing this one, so the
+                # downloads overlap with encoding, compression and writing
+                if cursor:
+                    # Each cursor comes from the page before it, so only one
+                    # page can be requested ahead. An unchanged cursor means
+                    # there is nothing left.
+                    next_mark = data['nextCursorMark']
+                    next_start = batch_start + len(docs)
+                    if next_start < total_docs and next_mark != cursor_mark:
+                        url = batch_url(next_start, next_mark)
+                        pending.append((next_start, executor.submit(
+                            fetch_batch, url, headers, wait_time, debug_level, fetch_duration, stop=stop)))
+                elif batch_start + len(docs) < total_docs and len(docs) != rows:
+                    # The server returned a different number of rows than we
+                    # asked for before the end, so the offsets already
+                    # requested are wrong. Carry on from where this batch ends
+                    # in batches of the size it actually gives us.
+                    if not docs:
+                        print(
+                            f"Error: No records returned from {batch_start} of {total_docs}.",
+                            file=sys.stderr)
+                        if file is not None:
+                            checkpoint()
+                        sys.exit(1)
+                    print(
+                        f"Got {len(docs)} rows rather than {rows}. Continuing from {batch_start + len(docs)} in batches of {len(docs)}.",
+                        file=sys.stderr)
+                    rows = len(docs)
+                    for _, future in pending:
+                        future.cancel()
+                    pending.clear()
+                    next_start = batch_start + len(docs)
+                while len(pending) < workers and next_start < total_docs and not cursor:
+                    url = batch_url(next_start, None)
+                    pending.append((next_start, executor.submit(
+                        fetch_batch, url, headers, wait_time, debug_level, fetch_duration, workers, stop)))
+                    next_start += rows
+
+                # Encode the whole batch up front and hand it to the file in
+                # one write, keeping one record per line. An empty first item
+                # puts the separator from the previous batch in the same join.
+                if docs and jsonl:
+                    write(b"".join(
+                        orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE) for doc in docs))
+                elif docs:
+                    encoded = [orjson.dumps(doc) for doc in docs]
                     if not first_record:
-                        file.write(b",\n")
-                    else:
-                        first_record = False
-                    json_data = json.dumps(doc, ensure_ascii=False).encode()
-                    file.write(json_data)
-                    file.flush()
-
-                start += len(docs)
+                        encoded.insert(0, b"")
+                    write(b",\n".join(encoded))
+                    first_record = False
+
+                start = batch_start + len(docs)
+                if cursor:
+                    cursor_mark = next_mark
                 total_fetched += len(docs)
                 total_bytes += content_size
+                batch_count += 1
 
-                # Save progress after each batch
-                save_progress(in_progress_file, {
-                    'start': start,
-                    'total_bytes': total_bytes,
-                    'total_docs': total_docs
-                })
+                if batch_count % PROGRESS_SAVE_INTERVAL == 0:
+                    checkpoint()
 
-                fetch_duration = fetch_end_time - fetch_start_time
-                overall_duration = fetch_end_time - overall_start_time
+                overall_duration = time.monotonic() - overall_start_time
                 overall_rate = total_fetched / overall_duration if overall_duration > 0 else 0
 
                 print(f"Fetched {len(docs)} documents in {fetch_duration:.2f} seconds. "
@@ -290,13 +659,11 @@ def stream_records(
                         f"x-kong-proxy-latency: {headers.get('x-kong-proxy-latency', 'N/A')}",
                         file=sys.stderr)
 
-                if start < total_docs:
-                    check_rate_limit(headers, wait_time)
-                else:
-                    file.write(b"]")  # End of JSON array
+                if not pending and not jsonl:
+                    write(b"]")  # End of JSON array
 
-        # Remove progress xattr and rename file when complete
-        xattr.removexattr(in_progress_file, PROGRESS_XATTR_NAME)
+        # Remove progress and rename file when complete
+        remove_progress(in_progress_file)
         os.rename(in_progress_file, output_file)
         print(
             f"Download complete. Output saved to {output_file}",
@@ -310,6 +677,12 @@ def stream_records(
             "\nInterrupted. Progress saved. You can resume later using the --resume flag.",
             file=sys.stderr)
         sys.exit(1)
+    finally:
+        # Don't wait for in-flight prefetches if we're bailing out early. Their
+        # threads are still joined at exit, so wake any that are sleeping.
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        SESSION.close()
 
 
 def process_query_arguments(args):
@@ -326,8 +699,9 @@ def process_query_arguments(args):
 
     if args.series:
         series_str = " ".join(map(str, args.series))
+        parents_str = " ".join(f"VPRS{series_id}" for series_id in args.series)
         # Series and Items have a series_id, but Consignment we have to find using the parent id
-        query_parts.append(f"(series_id:({series_str}) OR (category:(Consignment) AND parents.ids:(VPRS{series_str})))")
+        query_parts.append(f"(series_id:({series_str}) OR (category:(Consignment) AND parents.ids:({parents_str})))")
     elif args.query:
         query_parts.append(f"({args.query})")
 
@@ -362,11 +736,19 @@ def main():
     parser.add_argument(
         '--output',
         type=str,
-        help='Output file name (default: harvest.json or harvest.json.zst if compressed)')
+        help='Output file name (default: harvest.json or harvest.jsonl, with .zst if compressed)')
+    parser.add_argument(
+        '--jsonl',
+        action='store_true',
+        help='Write one JSON record per line (JSON Lines) rather than a JSON array')
     parser.add_argument(
         '--rows',
         type=int,
         help='Number of rows to fetch per request')
+    parser.add_argument(
+        '--fields',
+        type=str,
+        help='Comma-separated list of fields to return, e.g. identifier.PROV_ACM.id,title (default: all fields)')
     parser.add_argument(
         '--resume',
         action='store_true',
@@ -380,6 +762,13 @@ def main():
         type=int,
         default=0,
         help='Additional wait time between requests in seconds (default: 0)')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        choices=range(1, MAX_WORKERS + 1),
+        default=1,
+        metavar='N',
+        help=f'Number of requests to have in flight at once (default: 1, max: {MAX_WORKERS})')
     parser.add_argument(
         '--sort',
         choices=['identifier', 'score', 'title'],
@@ -395,30 +784,49 @@ def main():
         type=int,
         default=0,
         help='Starting index for the query (for debugging purposes)')
+    parser.add_argument(
+        '--cursor',
+        action='store_true',
+        help='Page through results with a Solr cursor rather than start offsets, which stays fast deep into large harvests')
     parser.add_argument(
         '--version',
         action='version',
         version=f'%(prog)s {VERSION}')
     args = parser.parse_args()
 
-    PARAMS['q'] = process_query_arguments(args)
+    if args.cursor and args.workers > 1:
+        parser.error("--cursor fetches one page at a time and can't be used with --workers")
+    if args.cursor and args.start:
+        parser.error("--cursor can't be used with --start")
+
+    params = dict(DEFAULT_PARAMS)
+    params['q'] = process_query_arguments(args)
 
     if args.sort == 'identifier':
         # Keep the default sort parameter
         pass
     elif args.sort == 'title':
-        PARAMS['sort'] = 'Series_title asc'
+        params['sort'] = 'Series_title asc'
     elif args.sort == 'score':
         # Remove the sort parameter
-        PARAMS.pop('sort', None)
+        params.pop('sort', None)
+
+    if args.cursor:
+        # Offsets get slower the deeper they go, cursors don't, but they need
+        # the unique key to break ties in the sort
+        params['sort'] = f"{params.get('sort', 'score desc')},{CURSOR_TIEBREAK_SORT}"
 
     if args.rows:
-        PARAMS['rows'] = str(args.rows)
+        params['rows'] = str(args.rows)
+
+    if args.fields:
+        # Only ask for what's needed, which cuts both the download and the parsing
+        params['fl'] = args.fields
 
     if args.output:
         output_file = args.output
     else:
-        output_file = 'harvest.json.zst' if args.compress else 'harvest.json'
+        output_file = 'harvest.jsonl' if args.jsonl else 'harvest.json'
 
     # Add .zst extension if compress is True and extension is not already
     # present
@@ -432,7 +840,11 @@ def main():
         compress=args.compress,
         debug_level=args.debug,
         wait_time=args.wait,
-        start_index=args.start)
+        start_index=args.start,
+        workers=args.workers,
+        params=params,
+        cursor=args.cursor,
+        jsonl=args.jsonl)
 
 
 if __name__ == "__main__":
@@ -23,19 +23,25 @@ from urllib.parse import urlencode
 from datetime import date
 
 import requests
+from requests.adapters import HTTPAdapter
 
 VERSION = "0.1.6"
 
 BASE_URL = "https://api.prov.vic.gov.au/search/query"
 PARAMS = {
     "rows": "1000",
-    "start": "0",
     "wt": "json",
 }
 
 MAX_RETRIES = 6
 BASE_WAIT_TIME = 63
 
+# Reuse one keep-alive connection for every page rather than paying for a new
+# TCP and TLS handshake each time
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+SESSION.headers["User-Agent"] = f"prov-api-track/{VERSION}"
+
 
 def normalise_keys(docs):
     """
@@ -51,14 +57,11 @@ def normalise_keys(docs):
     for doc in docs:
         all_keys.update(doc.keys())
 
-    sorted_keys = sorted(all_keys)
-
-    normalised_docs = []
-    for doc in docs:
-        normalised_doc = {key: doc.get(key, None) for key in sorted_keys}
-        normalised_docs.append(normalised_doc)
+    # Every key set to None in sorted order, so merging a document over it
+    # fills in its values without changing the key order
+    template = dict.fromkeys(sorted(all_keys))
 
-    return normalised_docs
+    return [{**template, **doc} for doc in docs]
 
 
 def fetch_data(url):
@@ -76,7 +79,7 @@ def fetch_data(url):
     """
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(url)
+            response = SESSION.get(url, timeout=60)
             response.raise_for_status()
             return response.json(), response.headers
         except requests.RequestException as e:
@@ -117,21 +120,18 @@ def custom_sort_key(doc):
         tuple: A tuple for sorting, containing the alphabetical part and numerical parts.
     """
     id_value = doc.get("identifier.PROV_ACM.id", "")
-    parts = id_value.split(" ", 1)
+    alpha, space, rest = id_value.partition(" ")
 
-    if len(parts) == 2:
-        alpha_part = parts[0].upper()
-        num_parts = parts[1].split("/")
+    if space:
+        alpha_part = alpha.upper()
+        num_str, _, tail = rest.partition("/")
 
         try:
-            num_part1 = int(num_parts[0])
+            num_part1 = int(num_str)
         except ValueError:
             num_part1 = float('inf')
 
-        if len(num_parts) > 1:
-            num_part2 = num_parts[1].upper()
-        else:
-            num_part2 = ""
+        num_part2 = tail.partition("/")[0].upper()
     else:
         alpha_part = id_value.upper()
         num_part1 = float('inf')
@@ -171,34 +171,39 @@ def fetch_all_docs(type_query):
     start = 0
     total_docs = float('inf')
 
-    while start < total_docs:
-        PARAMS['start'] = str(start)
-        PARAMS['q'] = type_query
-        url = f"{BASE_URL}?{urlencode(PARAMS)}"
+    # Only the start offset changes between pages, so build the rest of the
+    # URL once
+    base_url = f"{BASE_URL}?{urlencode({**PARAMS, 'q': type_query})}"
 
-        print(f"Fetching data from {url}", file=sys.stderr)
-        try:
-            data, headers = fetch_data(url)
-        except requests.RequestException as e:
-            print(
-                f"Failed to fetch data after multiple retries: {e}",
-                file=sys.stderr)
-            sys.exit(1)
+    try:
+        while start < total_docs:
+            url = f"{base_url}&start={start}"
 
-        docs = data['response']['docs']
-        all_docs.extend(docs)
+            print(f"Fetching data from {url}", file=sys.stderr)
+            try:
+                data, headers = fetch_data(url)
+            except requests.RequestException as e:
+                print(
+                    f"Failed to fetch data after multiple retries: {e}",
+                    file=sys.stderr)
+                sys.exit(1)
 
-        total_docs = data['response']['numFound']
-        start += len(docs)
+            docs = data['response']['docs']
+            all_docs.extend(docs)
 
-        print(
-            f"Fetched {
-                len(docs)} documents. Total: {
-                len(all_docs)}/{total_docs}",
-            file=sys.stderr)
+            total_docs = data['response']['numFound']
+            start += len(docs)
+
+            print(
+                f"Fetched {
+                    len(docs)} documents. Total: {
+                    len(all_docs)}/{total_docs}",
+                file=sys.stderr)
 
-        if start < total_docs:
-            check_rate_limit(headers)
+            if start < total_docs:
+                check_rate_limit(headers)
+    finally:
+        SESSION.close()
 
     return all_docs
 
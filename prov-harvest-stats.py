@@ -3,6 +3,7 @@
 # requires-python = ">=3.13"
 # dependencies = [
 #     "ijson",
+#     "orjson",
 #     "zstandard",
 # ]
 # ///
@@ -14,6 +15,7 @@ Generate stats for data harvested from the PROV API
 Dependencies:
     - Python 3.6+
     - ijson (install with: pip install ijson)
+    - orjson (install with: pip install orjson)
     - zstandard (install with: pip install zstandard)
 
 Usage:
@@ -28,16 +30,20 @@ Usage:
 import argparse
 from collections import Counter, defaultdict
 from datetime import datetime, timezone
-import json
+from functools import cache
+from operator import itemgetter
 import re
 import sys
 import os
 
 import ijson
+import orjson
 import zstandard as zstd
 
 VERSION = "0.1.0"
 
+AGENCY_ID_RE = re.compile(r'VA(\d+)')
+
 
 def is_zstandard_compressed(file_path):
     """Check if the file is Zstandard compressed."""
@@ -61,7 +67,10 @@ def get_input_stream(input_source):
         if is_zstandard_compressed(input_source):
             try:
                 dctx = zstd.ZstdDecompressor()
-                return dctx.stream_reader(open(input_source, 'rb'))
+                # The harvester ends a frame at every progress save, so keep
+                # reading past them
+                return dctx.stream_reader(
+                    open(input_source, 'rb'), read_across_frames=True)
             except Exception as e:
                 raise RuntimeError(
                     f"Error opening compressed file '{input_source}': {
@@ -111,33 +120,17 @@ def process_json_stream(input_source):
 
     try:
         input_stream = get_input_stream(input_source)
-        parser = ijson.parse(input_stream)
-
-        in_array = ''
-        current_array = []
-
-        for prefix, event, value in parser:
-            if prefix == 'item' and event == 'start_map':
-                obj = {}
-            elif prefix.startswith('item.') and event == 'start_array':
-                in_array = prefix.removeprefix('item.')
-                current_array = []
-            elif prefix.startswith('item.') and event == 'end_array':
-                obj[in_array] = current_array
-                in_array = ''
-            elif in_array != '':
-                current_array.append(value)
-            elif prefix.startswith('item.'):
-                key = prefix.split('.', 1)[1]
-                obj[key] = value
-            elif prefix == 'item' and event == 'end_map':
-                process_object(obj, stats)
-                stats['objects'] += 1
-                if stats['objects'] % 10000 == 0:
-                    sys.stderr.write(
-                        f"\rProcessed {
-                            stats['objects']} objects...")
-                    sys.stderr.flush()
+
+        # Let ijson's C backend build each record rather than reassembling
+        # them from parser events in Python
+        for obj in ijson.items(input_stream, 'item', use_float=True):
+            process_object(obj, stats)
+            stats['objects'] += 1
+            if stats['objects'] % 10000 == 0:
+                sys.stderr.write(
+                    f"\rProcessed {
+                        stats['objects']} objects...")
+                sys.stderr.flush()
 
         sys.stderr.write(
             f"\rProcessed {
@@ -164,73 +157,87 @@ def process_json_stream(input_source):
             input_stream.close()
 
 
-def extract_series_id_from_entity_id(entity_id):
-    """Extract series ID from entity ID."""
-    match = re.match(r'VPRS(\d+)/', entity_id)
-    return match.group(1) if match else None
+def extract_series_id(reference, prefix, suffix='/'):
+    """Extract series ID from a VPRS reference (<prefix><digits><suffix>...)."""
+    if not reference.startswith(prefix):
+        return None
+    start = len(prefix)
+    end = reference.find('/', start)
+    series_id = reference[start:end]
+    if end > start and series_id.isdecimal() and reference.startswith(suffix, end):
+        return int(series_id)
+    return None
 
 
-def extract_series_id_from_identifier(identifier):
-    """Extract series ID from identifier."""
-    match = re.match(r'VPRS (\d+)/P', identifier)
-    return match.group(1) if match else None
+@cache
+def year_of_day(day):
+    """Get the UTC year of a day since the epoch as a string."""
+    return str(datetime.fromtimestamp(day * 86400, tz=timezone.utc).year)
 
 
 def process_object(obj, stats):
     """Process a single object and update statistics."""
-    category = obj.get('category', 'Unknown')
+    get = obj.get
+    category = get('category', 'Unknown')
 
     stats['category'][category] += 1
 
     if category == 'Agency':
-        agency_id = obj.get('identifier.PROV_ACM.id', '').replace(' ', '')
+        agency_id = get('identifier.PROV_ACM.id', '').replace(' ', '')
         if agency_id != '':
             agency_stats = stats['agencies'][agency_id]
-            agency_stats['title'] = obj.get('title', '')
+            agency_stats['title'] = get('title', '')
         return
 
     # Extract series_id
     if category == 'Consignment':
-        identifier = obj.get('identifier.PROV_ACM.id')
-        series_id = extract_series_id_from_identifier(
-            identifier) if identifier else 'Unknown'
+        identifier = get('identifier.PROV_ACM.id')
+        # Consignment ids look like 'VPRS 123/P0001'
+        series_id = extract_series_id(
+            identifier, 'VPRS ', '/P') if identifier else 'Unknown'
     elif category == 'relatedEntity':
-        entity_id = obj.get('_id')
-        series_id = extract_series_id_from_entity_id(entity_id)
+        entity_id = get('_id')
+        # Related entity ids look like 'VPRS123/...'
+        series_id = extract_series_id(entity_id, 'VPRS')
     else:
-        series_id = obj.get('series_id', 'Unknown')
+        series_id = get('series_id', 'Unknown')
+        # Numeric series ids are kept as ints so they sort without a key
+        # function
+        if isinstance(series_id, str) and series_id.isdecimal():
+            series_id = int(series_id)
+
+    series_stats = stats['series'][series_id]
 
     # Process year stats for all objects
     if 'timestamp' in obj:
         try:
             timestamp = int(obj['timestamp'])
-            year = datetime.fromtimestamp(timestamp, tz=timezone.utc).year
-            year_str = str(year)
+            # Every timestamp in a day falls in the same year, so only work
+            # out the year once per day
+            year_str = year_of_day(timestamp // 86400)
             stats['year'][year_str] += 1
 
             # Only update series year stats if category is not 'Series'
             if category != 'Series':
-                stats['series'][series_id]['years'][year_str] += 1
+                series_stats['years'][year_str] += 1
         except (ValueError, OverflowError):
             stats['year']['Invalid'] += 1
 
-    series_stats = stats['series'][series_id]
-
-    # Stats for each series
-    if category == 'Consignment':
-        series_stats['consignments'] += 1
-    elif category == 'Image':
-        series_stats['images'] += 1
-    elif category == 'Item':
+    # Stats for each series, most common categories first
+    if category == 'Item':
         series_stats['items'] += 1
         # Check if the item is a unit
-        if obj.get('barcode') == obj.get('box_barcode'):
+        if get('barcode') == get('box_barcode'):
             series_stats['units'] += 1
             stats['units'] += 1
+    elif category == 'Image':
+        series_stats['images'] += 1
     elif category == 'relatedEntity':
         series_stats['related_entities'] += 1
+    elif category == 'Consignment':
+        series_stats['consignments'] += 1
     elif category == 'Series':
-        series_stats['title'] = obj.get('title', '')
+        series_stats['title'] = get('title', '')
 
     # Count items with 'iiif-manifest' key
     if 'iiif-manifest' in obj:
@@ -239,10 +246,11 @@ def process_object(obj, stats):
 
     # Process agency information from items
     # (we may have a harvest with no Agency records)
-    agencies_ids = obj.get('agencies.ids', [])
-    if agencies_ids:
-        series_stats['agencies'].update(agencies_ids)
-    agencies_titles = obj.get('agencies.titles', [])
+    agencies_ids = get('agencies.ids')
+    if not agencies_ids:
+        return
+    series_stats['agencies'].update(agencies_ids)
+    agencies_titles = get('agencies.titles', ())
     for i, agency_id in enumerate(agencies_ids):
         agency_stats = stats['agencies'][agency_id]
         if i < len(agencies_titles):
@@ -250,14 +258,6 @@ def process_object(obj, stats):
         agency_stats['series'].add(series_id)
 
 
-def sort_dict(d):
-    """Sort a dictionary recursively."""
-    return {
-        k: sort_dict(v) if isinstance(
-            v, dict) else v for k, v in sorted(
-            d.items())}
-
-
 def print_stats_json(stats):
     """Print the final statistics in JSON format."""
     overall = {
@@ -269,25 +269,22 @@ def print_stats_json(stats):
     }
 
     def agency_sort_key(agency_id):
-        match = re.search(r'VA(\d+)', agency_id)
+        match = AGENCY_ID_RE.search(agency_id)
         return int(match.group(1)) if match else float('inf')
 
-    def series_sort_key(item):
-        series_id = item[0]
-        try:
-            return int(series_id)
-        except ValueError:
-            return float('inf')
-
-    valid_series = [
-        (sid, sstats) for sid, sstats in stats['series'].items() if sid not in (
-            None, "Unknown")]
-    sorted_series = sorted(valid_series, key=series_sort_key)
+    numeric_series = []
+    other_series = []
+    for sid, sstats in stats['series'].items():
+        if isinstance(sid, int):
+            numeric_series.append((sid, sstats))
+        elif sid not in (None, "Unknown"):
+            other_series.append((sid, sstats))
+    sorted_series = sorted(numeric_series, key=itemgetter(0)) + other_series
 
     series_data = []
     for series_id, series_stats in sorted_series:
         series_item = {
-            "id": series_id,
+            "id": str(series_id),
             "title": series_stats['title'],
             "agencies": sorted(series_stats['agencies'], key=agency_sort_key),
             "consignments": series_stats['consignments'],
@@ -324,7 +321,7 @@ def print_stats_json(stats):
             'iiif_manifests': agency_stats['iiif_manifests'],
             'images': agency_stats['images'],
             "items": agency_stats['items'],
-            "series": sorted(agency_stats['series'], key=int),
+            "series": [str(sid) for sid in sorted(agency_stats['series'])],
             'units': agency_stats['units'],
             'years': dict(sorted(agency_stats['years'].items()))
         }
@@ -336,23 +333,9 @@ def print_stats_json(stats):
         "series": series_data
     }
 
-    class SortedDict(dict):
-        """A dictionary that maintains sorted keys."""
-
-        def __iter__(self):
-            return iter(sorted(super().__iter__()))
-
-    def dict_to_sorted_dict(d):
-        if isinstance(d, dict):
-            return SortedDict((k, dict_to_sorted_dict(v))
-                              for k, v in d.items())
-        if isinstance(d, list):
-            return [dict_to_sorted_dict(v) for v in d]
-        return d
-
-    sorted_output = dict_to_sorted_dict(output)
-
-    print(json.dumps(sorted_output, indent=2))
+    # Write the bytes straight out rather than building one huge str first
+    sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    sys.stdout.buffer.write(b"\n")
 
 
 def main():
@@ -369,6 +352,14 @@ def main():
         version=f'%(prog)s {VERSION}')
     args = parser.parse_args()
 
+    # ijson falls back to pure Python if its C extension isn't available,
+    # which makes a full harvest take many times longer
+    if ijson.backend != 'yajl2_c':
+        print(
+            f"Warning: ijson is using the {ijson.backend} backend rather than yajl2_c, "
+            "so this will be slow.",
+            file=sys.stderr)
+
     if args.input:
         process_json_stream(args.input)
     else: